@@ -42,3 +42,5 @@ INPUT_TEMPLATE_ITEMS_SEPARATOR = "templateItemsSeparator"
 INPUT_VALUES = "values"
 MAX_PREFIXED_NAME_LENGTH = 253
 MAX_NAME_LENGTH = 63
+# YAML 1.1 true-ish values (see https://yaml.org/type/bool.html), compared lowercased
+TRUE_VALUES = frozenset({"on", "true", "y", "yes"})
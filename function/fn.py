@@ -4,8 +4,11 @@ This function loads environment data and mutates all resources of a composition
 to have a proper name, labels and (optionally) tags.
 """
 
-import asyncio
-from copy import deepcopy
+import functools
+from collections import ChainMap
+from collections.abc import Iterator, Mapping, MutableMapping
+from dataclasses import dataclass, field
+from typing import Any
 
 import grpc
 from caseconverter import camelcase, kebabcase
@@ -17,51 +20,51 @@ from google.protobuf import struct_pb2 as structpb
 
 import function.constants as c
 
+# Case conversions are pure and their inputs (annotation suffixes, template items and label keys)
+# repeat across resources, so cache them.
+_camelcase = functools.lru_cache(maxsize=2048)(camelcase)
+_kebabcase = functools.lru_cache(maxsize=2048)(kebabcase)
 
-def _dot_notation_to_struct_field(
-    struct: structpb.Struct,
-    path: str,
-) -> structpb.Struct | None:
-    """Get a reference to a field from a Struct using dot notation.
 
-    It does not return the field contents, but the struct reference to it.
+def _walk_segments(
+    struct: structpb.Struct | Mapping[str, Any],
+    segments: tuple[str, ...],
+) -> tuple[structpb.Struct | Mapping[str, Any], str] | tuple[None, None]:
+    """Walk a Struct (or dict) through a dot notation path already split into segments.
+
+    Returns a tuple of (parent, key) where `parent[key]` is the referenced field, or
+    (None, None) if any segment of the path is missing.
     """
-    first, _, rest = path.partition(".")
-    if rest and (first in struct):
-        return _dot_notation_to_struct_field(struct[first], rest)
-    elif first in struct:
-        return struct
+    cur = struct
+    for p in segments[:-1]:
+        if p not in cur:
+            return None, None
+        cur = cur[p]
+    last = segments[-1]
+    return (cur, last) if last in cur else (None, None)
 
 
 def _dot_notation_to_struct_field_create_if_not_existing(
     struct: structpb.Struct,
     path: str,
-    constructor: any,
+    constructor: Any,
 ) -> structpb.Struct:
     """Get a reference to a field from a Struct using dot notation.
 
-    If the field does not exist, it will be created based on the constructor.
-    It does not return the field contents, but the struct reference to it.
+    If the field (or any of its parents) does not exist, it will be created based on the
+    constructor. When the constructor is a dict, the referenced struct itself is returned,
+    otherwise the struct holding the field is returned.
     """
-    res = _dot_notation_to_struct_field(struct, path)
-    if not res:
-        # Create the field if it does not exist
-        first, _, rest = path.partition(".")
-        if first not in struct:
-            if "." in rest:
-                struct.update({first: resource.struct_to_dict({rest.split(".")[0]: {}})})
-            elif rest:
-                struct.update({first: {rest: constructor}})
-            else:
-                struct.update({first: constructor})
-                return struct[first] if isinstance(constructor, dict) else struct
-            return struct[first]
-        return _dot_notation_to_struct_field_create_if_not_existing(
-            struct[first],
-            rest,
-            constructor=constructor,
-        )
-    return res
+    parts = path.split(".")
+    cur = struct
+    for p in parts[:-1]:
+        if p not in cur:
+            cur[p] = {}
+        cur = cur[p]
+    last = parts[-1]
+    if last not in cur:
+        cur[last] = constructor
+    return cur[last] if isinstance(constructor, dict) else cur
 
 
 def _get_resource_kind_and_name(res: structpb.Struct) -> tuple[str | None, str | None]:
@@ -72,21 +75,32 @@ def _get_resource_kind_and_name(res: structpb.Struct) -> tuple[str | None, str |
 
 
 def _get_struct_field_using_dot_notation(
-    struct: structpb.Struct, path: str
+    struct: structpb.Struct | Mapping[str, Any], segments: tuple[str, ...]
 ) -> tuple[str, str] | None:
-    """Get a field from a Struct using dot notation.
+    """Get a field from a Struct using a dot notation path already split into segments.
 
     Returns a tuple of (field_key, field_value) or None if not found.
     """
-    ref = _dot_notation_to_struct_field(struct, path)
-    sub_path = path.rsplit(".", maxsplit=1)[-1]
-    if ref and sub_path in ref:
-        f = ref[sub_path]
-        if f:
-            return (sub_path, str(f))
-    return None
+    parent, key = _walk_segments(struct, segments)
+    if parent is None:
+        return None
+    v = parent[key]
+    return (key, str(v)) if v else None
+
+
+@functools.cache
+def _rfc952_table(valid_chars: tuple[str, ...] | str, replace_if_not_valid: str) -> dict:
+    """Build a str.translate table replacing every invalid ASCII character."""
+    return str.maketrans(
+        {
+            chr(i): replace_if_not_valid
+            for i in range(128)
+            if not (chr(i).isalnum() or chr(i) in valid_chars)
+        }
+    )
 
 
+@functools.lru_cache(maxsize=4096)
 def _to_rfc952_name(
     name: str, max_length=c.MAX_NAME_LENGTH, replace_if_not_valid="-", valid_chars=(".", "-")
 ) -> str:
@@ -95,26 +109,136 @@ def _to_rfc952_name(
     That is, it only contains alphanumeric characters and hyphens. RFC952 restrictions about the
     length are optional here, since RFC 1123 is less restrictive than RFC 952 in that regard.
     When a character is not valid, it is replaced with a hyphen.
+    Results are cached, since the same label values are sanitized for every resource.
     """
-    sanitized = "".join(
-        char if (char.isalnum() or char in valid_chars) else replace_if_not_valid for char in name
-    )
+    if name.isascii():
+        sanitized = name.translate(_rfc952_table(valid_chars, replace_if_not_valid))
+    else:
+        sanitized = "".join(
+            char if (char.isalnum() or char in valid_chars) else replace_if_not_valid
+            for char in name
+        )
     return sanitized.strip(replace_if_not_valid)[:max_length]
 
 
+class _StructView(Mapping):
+    """A read-only dict-like view of a Struct, converting fields to Python objects on first access.
+
+    Converted values are cached and shared by every reader, so they must not be modified.
+    """
+
+    def __init__(self, struct: structpb.Struct):
+        """Create a new view of a Struct."""
+        self._struct = struct
+        self._cache: dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        """Get a field, converting it from the Struct if needed."""
+        if key not in self._cache:
+            # Check first, since looking up a missing key would insert it in the Struct
+            if key not in self._struct:
+                raise KeyError(key)
+            value = self._struct[key]
+            if isinstance(value, structpb.Struct | structpb.ListValue):
+                value = resource.struct_to_dict(value)
+            self._cache[key] = value
+        return self._cache[key]
+
+    def __contains__(self, key: object) -> bool:
+        """Check if a field exists without converting it."""
+        return key in self._struct
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the field names."""
+        return iter(self._struct)
+
+    def __len__(self) -> int:
+        """Count the fields."""
+        return len(self._struct)
+
+
+@dataclass(slots=True)
+class _AnnotationConfig:
+    """The resource-specific configuration, read once from the resource annotations."""
+
+    name_sep: str = c.DEFAULT_NAME_TEMPLATE_SEPARATOR
+    # The separator requested by the resource when it isn't allowed (name_sep is the fallback)
+    invalid_name_sep: str | None = None
+    name_template_items: tuple[tuple[str, tuple[str, ...] | None], ...] = ()
+    tags_field: str = ""
+    include_external_name: bool = False
+    include_forprovider_name: bool = False
+    forprovider_name_field: str = "name"
+    forprovider_nameoverride: bool = False
+    include_name_tag: bool = False
+    labels_as_tags: bool = False
+    skip_name_modification: bool = False
+    replicate_labels_to: str | None = None
+
+
 class Resource:
     """Resource is a wrapper around a resource with a resource-specific environment."""
 
-    def __init__(self, environment: dict, name: str, res: structpb.Struct):
+    __slots__ = (
+        "_dirty",
+        "_metadata_struct",
+        "config",
+        "environment",
+        "fn_annotations",
+        "metadata",
+        "ref",
+        "resource",
+    )
+
+    def __init__(self, environment: Mapping[str, Any], name: str, res: structpb.Struct):
         """Create a new Resource."""
-        self.environment = deepcopy(environment)
-        if "metadata" in res:
-            self.metadata = deepcopy(resource.struct_to_dict(res["metadata"]))
-        else:
-            self.metadata = {}
+        # The environment is shared by all resources, so writes go to a resource-local layer
+        # and the shared one is only ever read.
+        self.environment: MutableMapping[str, Any] = ChainMap({}, environment)
+        self._metadata_struct = res.get_or_create_struct("metadata")
+        # struct_to_dict always returns a fresh dict, no need to copy it again.
+        self.metadata = resource.struct_to_dict(self._metadata_struct)
+        self._dirty: set[str] = set()
+        # Function-specific annotation keys, as found by Runner._parse_annotations
+        self.fn_annotations: list[str] = []
+        # Resource-specific configuration, as read by Runner._extract_annotation_config
+        self.config = _AnnotationConfig()
         self.ref = name
         self.resource = res
-        self.result = deepcopy(resource.struct_to_dict(res))
+
+    def set_metadata(self, key: str, value: Any) -> None:
+        """Set a top-level metadata field, flagging it to be written back."""
+        self.metadata[key] = value
+        self._dirty.add(key)
+
+    def write_metadata(self) -> None:
+        """Write the modified top-level metadata fields back to the resource."""
+        for key in self._dirty:
+            self._metadata_struct[key] = self.metadata[key]
+        self._dirty.clear()
+
+
+@dataclass(slots=True)
+class _RequestConfig:
+    """The function input of a request, parsed once for all resources."""
+
+    annotation_prefix: str = ""
+    label_prefix: str = ""
+    env_to_label: list[str] = field(default_factory=list)
+    mapped_values: list[dict] = field(default_factory=list)
+    input_tags: dict = field(default_factory=dict)
+    tags_field: str = ""
+    kebab: bool = True
+    labels_as_tags: bool = False
+    name_template: list[str] = field(default_factory=list)
+    name_sep: str = c.DEFAULT_NAME_TEMPLATE_SEPARATOR
+    # Derived values
+    name_template_items: tuple[tuple[str, tuple[str, ...] | None], ...] = ()
+    # (label, path segments, sanitized label key) for each ENV_TO_LABEL entry
+    label_items: tuple[tuple[str, tuple[str, ...], str], ...] = ()
+    # Path segments of each mapped value "from" field
+    mapped_value_paths: tuple[tuple[str, ...], ...] = ()
+    annotation_prefix_len: int = 0
 
 
 class Runner(grpcv1.FunctionRunnerService):
@@ -122,10 +246,8 @@ class Runner(grpcv1.FunctionRunnerService):
 
     def __init__(self):
         """Create a new FunctionRunner."""
-        self.annotation_prefix = ""
+        self.cfg = _RequestConfig()
         self.input = {}
-        self.label_prefix = ""
-        self.kebab_cased_labels_and_tags = True
         self.log = logging.get_logger()
         self.log.info("Starting function-naming-convention")
 
@@ -135,37 +257,56 @@ class Runner(grpcv1.FunctionRunnerService):
 
         See YAML 1.1 spec for booleans: https://yaml.org/type/bool.html.
         """
-        return str(data.get(name, default)).lower() in {
-            "on",
-            "true",
-            "y",
-            "yes",
-        }
+        value = data.get(name, default)
+        if isinstance(value, str):
+            return value.lower() in c.TRUE_VALUES
+        if isinstance(value, bool):
+            return value
+        return str(value).lower() in c.TRUE_VALUES
+
+    @staticmethod
+    def _parse_name_template(
+        items: list[str],
+    ) -> tuple[tuple[str, tuple[str, ...] | None], ...]:
+        """Parse name template items into (environment key, dot notation segments) pairs.
+
+        The environment key is the camelCased item, and the segments are only set for items in
+        dot notation (otherwise None).
+        """
+        return tuple((_camelcase(i), tuple(i.split(".")) if "." in i else None) for i in items)
+
+    def _parse_env_to_label(
+        self, env_to_label: list[str]
+    ) -> tuple[tuple[str, tuple[str, ...], str], ...]:
+        """Parse ENV_TO_LABEL entries into (label, dot notation segments, label key) tuples."""
+        label_items = []
+        for label in env_to_label:
+            segments = tuple(label.split("."))
+            label_key = self._sanitize_label(f"{self.cfg.label_prefix}{segments[-1]}")
+            label_items.append((label, segments, label_key))
+        return tuple(label_items)
 
     @staticmethod
     def _format_name_prefix(
-        environment: dict,
-        name_prefix_items: list[str],
+        environment: Mapping[str, Any],
+        name_template: tuple[tuple[str, tuple[str, ...] | None], ...],
         separator: str,
     ) -> str:
         """Format the name prefix using the resource environment."""
-        env = deepcopy(environment)
-        # First check if any of the name_prefix_items keys are in dot notation
-        for item in filter(lambda i: "." in i, name_prefix_items):
-            result = _get_struct_field_using_dot_notation(env, item)
+        formatted_items = []
+        for item, path in name_template:
+            # Items in dot notation take precedence over the camelCased key
+            result = _get_struct_field_using_dot_notation(environment, path) if path else None
             if result:
                 _, value = result
-                if value:
-                    env[camelcase(item)] = value
-        formatted_items = []
-        for i in name_prefix_items:
-            item = camelcase(i)
-            if item not in env:
+            elif item in environment:
+                value = environment[item]
+            else:
                 # Fail if any of the items is missing in order not to have a resource recreated in
                 # case the environment changes
                 msg = f"Failed to render name prefix from environment; missing key '{item}'"
                 raise message.EncodeError(msg)
-            formatted_items.append(env[item])
+            formatted_items.append(value)
         return separator.join(formatted_items)
 
     def _sanitize_label(self, name: str) -> str:
@@ -189,8 +330,8 @@ class Runner(grpcv1.FunctionRunnerService):
             max_prefix_length = c.MAX_PREFIXED_NAME_LENGTH - 1 - c.MAX_NAME_LENGTH
             prefix = _to_rfc952_name(prefix, max_length=max_prefix_length, valid_chars=("."))
         name = _to_rfc952_name(
-            kebabcase(name) if self.kebab_cased_labels_and_tags else name,
-            valid_chars=("-") if self.kebab_cased_labels_and_tags else ("-", "_", "."),
+            _kebabcase(name) if self.cfg.kebab else name,
+            valid_chars=("-") if self.cfg.kebab else ("-", "_", "."),
         )
         return prefix + "/" + name if prefix else name
 
@@ -199,28 +340,23 @@ class Runner(grpcv1.FunctionRunnerService):
         """Sanitize a name to be lowercase RFC 1123 subdomain compliant."""
         return _to_rfc952_name(name, valid_chars=("-", ".")).lower()
 
-    async def _cleanup_fn_specific_annotations(
-        self,
-        res: Resource,
-    ) -> None:
+    @staticmethod
+    def _cleanup_fn_specific_annotations(res: Resource) -> None:
         """Cleanup function-specific annotations.
 
         The function-specific annotations will be removed from the metadata,
         so the ending resource does not include them.
         """
-        try:
-            metadata = deepcopy(res.metadata)
-            for annotation in res.metadata.get("annotations", {}):
-                if annotation.startswith(self.annotation_prefix):
-                    metadata["annotations"].pop(annotation)
-            res.metadata = metadata
-        except Exception as exc:
-            self.log.error(f"Failed to cleanup annotations: {exc!r}")
+        annotations = res.metadata.get("annotations")
+        if not (annotations and res.fn_annotations):
+            return
+        # Pop in place, nothing else references the removed keys
+        for annotation in res.fn_annotations:
+            annotations.pop(annotation, None)
+        res.set_metadata("annotations", annotations)
 
-    def _get_from_annotation_or_input(
-        self, res: Resource, annotation_field: str, input_field: str, default: str = ""
-    ) -> str:
-        """Get a value from a Resource annotation or input if not present.
+    def _extract_annotation_config(self, res: Resource) -> _AnnotationConfig:
+        """Read the resource-specific configuration from the Resource annotations.
 
         Function inputs can be of two types, global and per resource. How those are read,
         ordered from highest to lowest precedence:
@@ -232,100 +368,126 @@ class Runner(grpcv1.FunctionRunnerService):
         Otherwise, the global format will be used.
         """
         annotations = res.metadata.get("annotations", {})
-        return annotations.get(annotation_field, self.input.get(input_field, default))
+        # The name template items both accept camelCase and kebab-case (e.g. both
+        # `namePrefix` and `name-prefix` will be equivalent).
+        name_sep = annotations.get(c.ANNOTATION_NAME_TEMPLATE_SEPARATOR, self.cfg.name_sep)
+        invalid_name_sep = None
+        if name_sep not in c.ALLOWED_TEMPLATE_SEPARATORS:
+            # Only reported by get_name, so resources without a name don't warn about it
+            invalid_name_sep = name_sep
+            name_sep = c.DEFAULT_NAME_TEMPLATE_SEPARATOR
+        name_template = annotations.get(c.ANNOTATION_NAME_TEMPLATE)
+        if name_template:
+            name_template_items = self._parse_name_template(name_template.split(name_sep))
+        else:
+            # Use the template from the function input, parsed once per request
+            name_template_items = self.cfg.name_template_items
+        return _AnnotationConfig(
+            name_sep=name_sep,
+            invalid_name_sep=invalid_name_sep,
+            name_template_items=name_template_items,
+            tags_field=annotations.get(c.ANNOTATION_TAGS_FIELD, self.cfg.tags_field),
+            include_external_name=self._check_if_true(
+                annotations, c.ANNOTATION_INCLUDE_EXTERNAL_NAME
+            ),
+            include_forprovider_name=self._check_if_true(
+                annotations, c.ANNOTATION_INCLUDE_FORPROVIDER_NAME
+            ),
+            forprovider_name_field=annotations.get(c.ANNOTATION_FORPROVIDER_NAME_FIELD, "name"),
+            forprovider_nameoverride=self._check_if_true(
+                annotations, c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE
+            ),
+            include_name_tag=self._check_if_true(
+                annotations, c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION
+            ),
+            labels_as_tags=self._check_if_true(
+                annotations, c.ANNOTATION_INCLUDE_LABELS_AS_TAGS, default=self.cfg.labels_as_tags
+            ),
+            skip_name_modification=self._check_if_true(annotations, c.ANNOTATION_SKIP_NAME_MODIFY),
+            replicate_labels_to=annotations.get(c.ANNOTATION_REPLICATE_LABELS_TO),
+        )
 
     def _parse_annotations(self, res: Resource) -> None:
         """Get input from function-specific annotations."""
-        for annotation, val in res.metadata.get("annotations", {}).items():
-            if annotation.startswith(self.annotation_prefix):
-                a = annotation[len(self.annotation_prefix) :]
-                # Update internal environment too
-                res.environment[camelcase(a)] = val
+        annotations = res.metadata.get("annotations", {})
+        prefix = self.cfg.annotation_prefix
+        res.fn_annotations = [a for a in annotations if a.startswith(prefix)]
+        for annotation in res.fn_annotations:
+            a = annotation[self.cfg.annotation_prefix_len :]
+            # Update internal environment too
+            res.environment[_camelcase(a)] = annotations[annotation]
 
     def get_name(
         self,
         res: Resource,
         name: str | None,
     ) -> str:
-        """Get the name for the resource as per the naming convention."""
+        """Get the name for the resource as per the naming convention.
+
+        Name prefix items and separator can be set from different sources, see
+        _extract_annotation_config.
+        """
         if not name:  # If name is not set, Crossplane will autogenerate it
             return name
-        annotations = res.metadata.get("annotations", {})
-        # Name prefix items and separator can be set from different sources.
-        # The items both accept camelCase and kebab-case (e.g. both
-        # `namePrefix` and `name-prefix` will be equivalent).
-        name_items_separator = self._get_from_annotation_or_input(
-            res,
-            c.ANNOTATION_NAME_TEMPLATE_SEPARATOR,
-            c.INPUT_TEMPLATE_ITEMS_SEPARATOR,
-            default=c.DEFAULT_NAME_TEMPLATE_SEPARATOR,
-        )
-        if name_items_separator not in c.ALLOWED_TEMPLATE_SEPARATORS:
+        if res.config.invalid_name_sep is not None:
             self.log.warning(
-                f"Invalid separator '{name_items_separator}' for {res.ref}, "
+                f"Invalid separator '{res.config.invalid_name_sep}' for {res.ref}, "
                 f"falling back to '{c.DEFAULT_NAME_TEMPLATE_SEPARATOR}'"
             )
-            name_items_separator = c.DEFAULT_NAME_TEMPLATE_SEPARATOR
-        fallback_name_items = self.input.get(c.INPUT_NAME_TEMPLATE, [])
-        name_prefix_items = annotations.get(c.ANNOTATION_NAME_TEMPLATE, None)
-        if name_prefix_items:
-            name_prefix_items = name_prefix_items.split(name_items_separator)
-        else:
-            name_prefix_items = fallback_name_items
-
+        separator = res.config.name_sep
         name_prefix = self._format_name_prefix(
-            res.environment, name_prefix_items, name_items_separator
+            res.environment, res.config.name_template_items, separator
         )
-        return (name_prefix + name_items_separator + name)[: c.MAX_NAME_LENGTH]
+        return (name_prefix + separator + name)[: c.MAX_NAME_LENGTH]
 
-    def get_labels(self, res: Resource) -> tuple[dict, set[str]]:
+    def get_labels(self, res: Resource) -> tuple[dict, bool]:
         """Get the labels for the resource as per the naming convention.
 
-        Returns a tuple of (all_labels, function_generated_keys) where
-        function_generated_keys is the set of label keys added by ENV_TO_LABEL.
+        Returns a tuple of (function_labels, changed) where function_labels only holds the labels
+        generated by ENV_TO_LABEL, and changed tells whether any of them is missing or has a
+        different value in the resource labels. The resource labels are never modified.
         """
-        labels = res.metadata.get("labels", {})
-        function_generated_keys: set[str] = set()
-        # Update the metadata labels with the environment variables and ensure
+        current_labels = res.metadata.get("labels", {})
+        labels = {}
+        changed = False
+        # Map the environment variables to labels and ensure
         # that the label name is RFC 1123 compliant.
         # The list of which environment variables are mapped comes from the
         # c.INPUT_ENV_TO_LABEL field in the function input.
         self.log.debug("Mutating labels")
-        for label in self.ENV_TO_LABEL:
-            result = _get_struct_field_using_dot_notation(res.environment, label)
+        for label, segments, label_key in self.cfg.label_items:
+            result = _get_struct_field_using_dot_notation(res.environment, segments)
             if not result:
                 self.log.debug(f"'{label}' not found in the context, skipping label mapping")
                 continue
-            key, value = result
+            _, value = result
             self.log.debug(f"Mapping env var '{label}' to label with value '{value}'")
             if value:
-                label_key = self._sanitize_label(f"{self.label_prefix}{key}")
                 labels[label_key] = _to_rfc952_name(value, valid_chars=("-", "_", "."))
-                function_generated_keys.add(label_key)
-        return labels, function_generated_keys
+                changed = changed or current_labels.get(label_key) != labels[label_key]
+        return labels, changed
 
-    async def mutate_external_name(self, res: Resource, new_name: str) -> None:
+    def mutate_external_name(self, res: Resource, new_name: str) -> None:
         """Conditionally set the external-name annotation for the resource."""
         try:
-            annotations = res.metadata.get("annotations", {})
-            if self._check_if_true(annotations, c.ANNOTATION_INCLUDE_EXTERNAL_NAME) and new_name:
+            if res.config.include_external_name and new_name:
+                annotations = res.metadata.get("annotations", {})
                 annotations.setdefault(
                     "crossplane.io/external-name",
                     new_name,
                 )
                 self.log.debug(f"Set external-name annotation to {new_name} for {res.ref}")
-                res.metadata["annotations"] = annotations
+                res.set_metadata("annotations", annotations)
         except Exception as exc:
             msg = f"Failed to set external-name annotation for {res.ref}: {exc!r}"
             raise message.EncodeError(msg) from exc
 
-    async def mutate_forprovider_name(self, res: Resource, new_name: str) -> None:
+    def mutate_forprovider_name(self, res: Resource, new_name: str) -> None:
         """Conditionally mutate the spec.forProvider.name for the resource."""
+        for_provider_name_field = res.config.forprovider_name_field
         try:
-            annotations = res.metadata.get("annotations", {})
-            for_provider_name_field = annotations.get(c.ANNOTATION_FORPROVIDER_NAME_FIELD, "name")
             if (
-                self._check_if_true(annotations, c.ANNOTATION_INCLUDE_FORPROVIDER_NAME)
+                res.config.include_forprovider_name
                 and "spec" in res.resource
                 and "forProvider" in res.resource["spec"]
             ):
@@ -339,7 +501,7 @@ class Runner(grpcv1.FunctionRunnerService):
                 # We ignore the current value of spec.forProvider.name if we
                 # are told to do so or if it is empty.
                 if (
-                    self._check_if_true(annotations, c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE)
+                    res.config.forprovider_nameoverride
                     or not field_reference[for_provider_name_field]
                 ):
                     field_reference[for_provider_name_field] = new_name
@@ -353,12 +515,12 @@ class Runner(grpcv1.FunctionRunnerService):
             msg = f"Failed to mutate forProvider.{for_provider_name_field} for {res.ref}: {exc!r}"
             raise message.EncodeError(msg) from exc
 
-    async def mutate_metadata(
+    def mutate_metadata(
         self,
         res: Resource,
         *,
         skip_name_modification: bool,
-    ) -> str:
+    ) -> tuple[str, dict]:
         """Modify the name and labels for the resource.
 
         Name is rendered according to {ANNOTATION,INPUT}_NAME_TEMPLATE.
@@ -366,13 +528,17 @@ class Runner(grpcv1.FunctionRunnerService):
         remain like that (Crossplane autogenerates the name).
         Metadata annotations may contain custom field variables starting
         with a given prefix. Both camelCase and kebab-case are supported.
+
+        Returns a tuple of (new_name, function_labels) where function_labels only
+        holds the labels generated by ENV_TO_LABEL.
         """
         self._parse_annotations(res)
         current_name = new_name = res.metadata.get("name", "")
-        new_labels, _ = self.get_labels(res)
-        if new_labels.keys() != res.metadata.get("labels", {}).keys():
+        function_labels, labels_changed = self.get_labels(res)
+        if labels_changed:
+            new_labels = {**res.metadata.get("labels", {}), **function_labels}
             self.log.debug(f"Mutating labels to {new_labels}")
-            res.metadata["labels"] = new_labels
+            res.set_metadata("labels", new_labels)
         if not skip_name_modification:
             new_name = self.get_name(
                 res=res,
@@ -383,16 +549,19 @@ class Runner(grpcv1.FunctionRunnerService):
             new_metadata_name = self._sanitized_name(new_name)
             if new_metadata_name != current_name:
                 self.log.debug(f"Mutating name to {new_metadata_name}")
-                res.metadata["name"] = new_metadata_name
-        return new_name
+                res.set_metadata("name", new_metadata_name)
+        return new_name, function_labels
 
-    async def mutate_resource(
+    def mutate_resource(
         self,
         res: Resource,
     ) -> structpb.Struct:
         """Mutate the resource to adhere the Naming convention."""
-        for mapped_value in self.input.get(c.INPUT_MAPPED_VALUES, []):
-            result = _get_struct_field_using_dot_notation(res.resource, mapped_value["from"])
+        res.config = self._extract_annotation_config(res)
+        for mapped_value, segments in zip(
+            self.cfg.mapped_values, self.cfg.mapped_value_paths, strict=True
+        ):
+            result = _get_struct_field_using_dot_notation(res.resource, segments)
             if not result:
                 self.log.debug(
                     f"'{mapped_value['from']}' not found in the resource, skipping mapped value"
@@ -420,13 +589,13 @@ class Runner(grpcv1.FunctionRunnerService):
                         f"No mapped value {v} from {mapped_value['from']}, falling back to {value}"
                     )
                 res.environment[mapped_value["to"]] = str(value).lower()
-        await self.run_mutations(res)
-        await self._cleanup_fn_specific_annotations(res)
-        # Finally dump the metadata back to the resource
-        res.resource["metadata"] = resource.dict_to_struct(res.metadata)
+        self.run_mutations(res)
+        self._cleanup_fn_specific_annotations(res)
+        # Finally dump the modified metadata fields back to the resource
+        res.write_metadata()
         return res.resource
 
-    async def mutate_tags(self, res: Resource, new_name: str) -> None:
+    def mutate_tags(self, res: Resource, new_name: str, labels: dict) -> None:
         """Conditionally mutate the tags for the resource.
 
         Tags are set according to multiple sources, in order of precedence (last will override):
@@ -434,6 +603,8 @@ class Runner(grpcv1.FunctionRunnerService):
           - Then inject the tags from the function input (optional).
           - Then, we add the (mutated) 'Name' tag if configured to do so.
           - Finally, we copy over labels as tags if configured to do so.
+
+        Only the labels generated by the function (ENV_TO_LABEL) are expected in `labels`.
         """
         if not (
             "spec" in res.resource
@@ -443,64 +614,56 @@ class Runner(grpcv1.FunctionRunnerService):
             self.log.debug(f"No tags field found for {res.ref}, skipping tags mutation")
             return  # Not a resource that supports tags
         self.log.debug(f"Mutating tags for {res.ref}")
-        annotations = res.metadata.get("annotations", {})
-        tags = res.resource["spec"]["forProvider"]["tags"]
+        # Merge all the sources first, so the tags Struct is only updated once
+        new_tags = {}
         # Set tags from 'tagsField' context key if set
-        tags_field = self._get_from_annotation_or_input(
-            res, c.ANNOTATION_TAGS_FIELD, c.INPUT_TAGS_FIELD
-        )
-        if res.environment.get(tags_field):
+        tags_field = res.config.tags_field
+        context_tags = res.environment.get(tags_field)
+        if context_tags:
             self.log.debug(f"Injecting tags from context key {tags_field} for {res.ref}")
-            try:
-                tags.update(res.environment[tags_field])
-            except ValueError:
+            if isinstance(context_tags, dict):
+                new_tags.update(context_tags)
+            else:
                 self.log.warning(f"Failed to set tags from context key {tags_field} for {res.ref}")
         # Inject tags from function input
-        input_tags = self.input.get(c.INPUT_TAGS, {})
+        input_tags = self.cfg.input_tags
         if input_tags:
             self.log.debug(f"Injecting tags from function input for {res.ref}")
-            try:
-                tags.update(input_tags)
-            except TypeError:
+            if isinstance(input_tags, dict):
+                new_tags.update(input_tags)
+            else:
                 self.log.warning(f"Failed to set tags from function input for {res.ref}")
         # Add Name tag if configured to do so
-        if self._check_if_true(annotations, c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION):
-            try:
-                self.log.debug(f"Mutating Name tag for {res.ref}")
-                tags.update({"Name": new_name})
-            except ValueError:
-                self.log.warning(f"Failed to set Name tag for {res.ref}")
+        if res.config.include_name_tag:
+            self.log.debug(f"Mutating Name tag for {res.ref}")
+            new_tags["Name"] = new_name
         # Copy labels as tags if configured to do so
-        if self._check_if_true(
-            annotations,
-            c.ANNOTATION_INCLUDE_LABELS_AS_TAGS,
-            default=self.input.get(c.INPUT_LABELS, {}).get(c.INPUT_LABELS_AS_TAGS, False),
-        ):
-            labels, function_label_keys = self.get_labels(res=res)
-            try:
-                # Only copy labels that were generated by the function (ENV_TO_LABEL)
-                self.log.debug(f"Copying labels to tags for {res.ref}")
-                tags.update({k: v for k, v in labels.items() if k in function_label_keys})
-            except ValueError:
-                self.log.warning(f"Failed to set tags from labels for {res.ref}")
-
-    async def process_resource(
+        if res.config.labels_as_tags:
+            self.log.debug(f"Copying labels to tags for {res.ref}")
+            new_tags.update(labels)
+        if new_tags:
+            res.resource["spec"]["forProvider"]["tags"].update(new_tags)
+
+    def process_resource(
         self,
         desired: structpb.Struct,
-        parent: structpb.Struct,
+        parent_ref: str | None,
         res: Resource,
     ) -> None:
-        """Process a single resource."""
-        if parent:
-            xr_kind, xr_name = _get_resource_kind_and_name(parent)
-            res.ref += f"@{xr_kind}/{xr_name}"
+        """Process a single resource.
+
+        The parent reference (`kind/name` of the composite resource) is shared by every resource
+        of a request, so it is expected to be resolved once by the caller.
+        """
+        if parent_ref:
+            res.ref += f"@{parent_ref}"
             self.log.debug(f"Processing resource {res.ref}")
         resource.update(
             desired,
-            await self.mutate_resource(res=res),
+            self.mutate_resource(res=res),
         )
 
-    async def read_environment(self, req: fnv1.RunFunctionRequest) -> None:
+    def read_environment(self, req: fnv1.RunFunctionRequest) -> None:
         """Read Context and the Function input.
 
         This context is shared by all resources of a composition, so we should never alter
@@ -516,60 +679,76 @@ class Runner(grpcv1.FunctionRunnerService):
                 request_context = req.context[context_gv][context_k]
             else:
                 request_context = req.context[context]
-            self.environment = resource.struct_to_dict(request_context)
+            if not isinstance(request_context, structpb.Struct):
+                msg = f"expected an object, got {type(request_context).__name__}"
+                raise ValueError(msg)
+            # Only the fields actually referenced by resources get converted to Python objects.
+            context_view = _StructView(request_context)
         except (KeyError, ValueError) as exc:
             msg = f"Failed to read context '{context}': {exc!r}"
             self.log.error(msg)
             raise Exception(msg) from exc
 
-        self.environment.update(self.input.get(c.INPUT_VALUES, {}))
-
-        a_prefix = self.input.get(c.INPUT_ANNOTATIONS, {}).get(c.INPUT_PREFIX, c.ANNOTATION_PREFIX)
-        a_separator = self.input.get(c.INPUT_ANNOTATIONS, {}).get(
-            c.INPUT_SEPARATOR, c.DEFAULT_PREFIX_SEPARATOR
-        )
-        l_prefix = self.input.get(c.INPUT_LABELS, {}).get(c.INPUT_PREFIX, "")
-        l_separator = self.input.get(c.INPUT_LABELS, {}).get(
-            c.INPUT_SEPARATOR, c.DEFAULT_PREFIX_SEPARATOR
+        # Input values take precedence over the context, without writing to the shared view.
+        self.environment = ChainMap(self.input.get(c.INPUT_VALUES, {}), context_view)
+
+        annotations_input = self.input.get(c.INPUT_ANNOTATIONS, {})
+        a_prefix = annotations_input.get(c.INPUT_PREFIX, c.ANNOTATION_PREFIX)
+        a_separator = annotations_input.get(c.INPUT_SEPARATOR, c.DEFAULT_PREFIX_SEPARATOR)
+        labels_input = self.input.get(c.INPUT_LABELS, {})
+        l_prefix = labels_input.get(c.INPUT_PREFIX, "")
+        l_separator = labels_input.get(c.INPUT_SEPARATOR, c.DEFAULT_PREFIX_SEPARATOR)
+        annotation_prefix = f"{a_prefix}{a_separator}" if a_prefix else ""
+        self.cfg = _RequestConfig(
+            annotation_prefix=annotation_prefix,
+            label_prefix=f"{l_prefix}{l_separator}" if l_prefix else "",
+            # Which Environment variables should be mapped to labels
+            env_to_label=self.input.get(c.INPUT_ENV_TO_LABEL, []),
+            mapped_values=self.input.get(c.INPUT_MAPPED_VALUES, []),
+            input_tags=self.input.get(c.INPUT_TAGS, {}),
+            tags_field=self.input.get(c.INPUT_TAGS_FIELD, ""),
+            kebab=self._check_if_true(self.input, c.INPUT_KEBAB_CASE_LABELS_AND_TAGS, default=True),
+            labels_as_tags=self._check_if_true(labels_input, c.INPUT_LABELS_AS_TAGS),
+            name_template=self.input.get(c.INPUT_NAME_TEMPLATE, []),
+            name_sep=self.input.get(
+                c.INPUT_TEMPLATE_ITEMS_SEPARATOR, c.DEFAULT_NAME_TEMPLATE_SEPARATOR
+            ),
+            annotation_prefix_len=len(annotation_prefix),
         )
-        self.annotation_prefix = f"{a_prefix}{a_separator}" if a_prefix else ""
-        self.label_prefix = f"{l_prefix}{l_separator}" if l_prefix else ""
-
-        self.kebab_cased_labels_and_tags = self._check_if_true(
-            self.input,
-            c.INPUT_KEBAB_CASE_LABELS_AND_TAGS,
-            default=self.kebab_cased_labels_and_tags,
+        # Paths and label keys only depend on the function input, so split and sanitize them
+        # once for all resources.
+        self.cfg.name_template_items = self._parse_name_template(self.cfg.name_template)
+        self.cfg.label_items = self._parse_env_to_label(self.cfg.env_to_label)
+        self.cfg.mapped_value_paths = tuple(
+            tuple(mapped_value["from"].split(".")) for mapped_value in self.cfg.mapped_values
         )
 
-    async def replicate_labels(self, res: Resource) -> None:
+    def replicate_labels(self, res: Resource) -> None:
         """Replicate labels from the resource's metadata to a given resource field."""
+        target_field = res.config.replicate_labels_to
+        if not target_field:
+            return
         try:
-            field = res.metadata.get("annotations", {}).get(c.ANNOTATION_REPLICATE_LABELS_TO)
-            if not field:
-                return
             labels = res.metadata.get("labels", {})
-            to = _dot_notation_to_struct_field_create_if_not_existing(res.resource, field, {})
+            to = _dot_notation_to_struct_field_create_if_not_existing(
+                res.resource, target_field, {}
+            )
             if labels and to is not None:
                 to.update(labels)
         except Exception as exc:
-            self.log.error(f"Failed to replicate labels to {field} for {res.ref}: {exc!r}")
+            self.log.error(f"Failed to replicate labels to {target_field} for {res.ref}: {exc!r}")
 
-    async def run_mutations(self, res: Resource) -> None:
+    def run_mutations(self, res: Resource) -> None:
         """Run all mutations on the resource."""
-        # Skip name modification when configured to do so
-        annotations = resource.struct_to_dict(res.resource.get_or_create_struct("metadata")).get(
-            "annotations", {}
-        )
-        skip_name_modification = self._check_if_true(annotations, c.ANNOTATION_SKIP_NAME_MODIFY)
-        new_name = await self.mutate_metadata(
+        new_name, function_labels = self.mutate_metadata(
             res=res,
-            skip_name_modification=skip_name_modification,
+            # Skip name modification when configured to do so
+            skip_name_modification=res.config.skip_name_modification,
         )
-        async with asyncio.TaskGroup() as tg:
-            tg.create_task(self.mutate_tags(res, new_name))
-            tg.create_task(self.replicate_labels(res))
-            tg.create_task(self.mutate_forprovider_name(res, new_name))
-            tg.create_task(self.mutate_external_name(res, new_name))
+        self.mutate_tags(res, new_name, function_labels)
+        self.replicate_labels(res)
+        self.mutate_forprovider_name(res, new_name)
+        self.mutate_external_name(res, new_name)
 
     async def RunFunction(
         self, req: fnv1.RunFunctionRequest, context: grpc.aio.ServicerContext
@@ -577,31 +756,29 @@ class Runner(grpcv1.FunctionRunnerService):
         """Run the function."""
         rsp = response.to(req)
         self.log.debug("Invoked function-naming-convention")
+        xr = req.observed.composite.resource
+        xr_kind, xr_name = _get_resource_kind_and_name(xr)
         try:
-            await self.read_environment(req)
-
-            # Populate which Environment variables should be mapped to labels
-            self.ENV_TO_LABEL = self.input.get(c.INPUT_ENV_TO_LABEL, [])
-            async with asyncio.TaskGroup() as tg:
-                for name in req.desired.resources:
-                    tg.create_task(
-                        self.process_resource(
-                            desired=rsp.desired.resources[name],
-                            parent=req.observed.composite.resource,
-                            res=Resource(
-                                environment=self.environment,
-                                name=name,
-                                res=req.desired.resources[name].resource,
-                            ),
-                        )
-                    )
-        except* Exception as exc:
+            self.read_environment(req)
+            parent_ref = f"{xr_kind}/{xr_name}" if xr else None
+            # Resources are processed one after the other: the mutations are CPU-bound, so there
+            # is nothing to gain from running them as separate tasks.
+            for name, desired in req.desired.resources.items():
+                self.process_resource(
+                    desired=rsp.desired.resources[name],
+                    parent_ref=parent_ref,
+                    res=Resource(
+                        environment=self.environment,
+                        name=name,
+                        res=desired.resource,
+                    ),
+                )
+        except Exception as exc:
             # Every error that has to do with a resource name modification will raise an exception
             # which is handled here, so we return a proper gRPC error and stop the pipeline.
             # This way we ensure that a valid name is not modified afterwards if something goes
             # wrong or a context field is missing.
             # Thus, we treat name fields as immutable once set.
-            xr_kind, xr_name = _get_resource_kind_and_name(req.observed.composite.resource)
             self.log.warning(f"Function failed to mutate resource {xr_kind}/{xr_name}: {exc!r}")
             await context.abort(grpc.StatusCode.INVALID_ARGUMENT, repr(exc))
         return rsp
@@ -1,1175 +1,783 @@
 # ruff: noqa: E501
+import asyncio
 import dataclasses
+import functools
+import json
 import unittest
 from unittest import mock
 
 import grpc
-from crossplane.function import logging, resource
+from crossplane.function import logging
 from crossplane.function.proto.v1 import run_function_pb2 as fnv1
 from google.protobuf import duration_pb2 as durationpb
-from google.protobuf import json_format
+from google.protobuf import json_format, message
 from google.protobuf import struct_pb2 as structpb
 
 import function.constants as c
 from function import fn
 
+logging.configure(level=logging.Level.DISABLED)
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True, frozen=True)
 class TestCase:
     reason: str
     req: fnv1.RunFunctionRequest
     want: fnv1.RunFunctionResponse
+    expects_abort: bool = False
 
 
-CONTEXT = structpb.Struct(
-    fields={
-        c.CONTEXT_KEY_ENVIRONMENT: structpb.Value(
-            struct_value=structpb.Struct(
-                fields={
-                    "account": structpb.Value(string_value="test"),
-                    "accountCode": structpb.Value(string_value="tst"),
-                    "accountId": structpb.Value(string_value="123456789012"),
-                    "awsTags": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                "environment": structpb.Value(string_value="Development"),
-                                "owner": structpb.Value(string_value="Team A"),
-                            }
-                        )
-                    ),
-                    "namePrefix": structpb.Value(string_value="aa-tst-usw2"),
-                    "region": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                "region": structpb.Value(string_value="us-west-2"),
-                                "regionCode": structpb.Value(string_value="usw2"),
-                            }
-                        )
-                    ),
-                }
-            )
-        )
+@functools.cache
+def _struct_bytes(frozen: str) -> bytes:
+    s = structpb.Struct()
+    s.update(json.loads(frozen))
+    return s.SerializeToString()
+
+
+def _struct(d: dict) -> structpb.Struct:
+    """Return a fresh Struct for d.
+
+    Identical dicts are keyed on their canonical JSON and only converted once.
+    """
+    s = structpb.Struct()
+    s.ParseFromString(_struct_bytes(json.dumps(d, sort_keys=True)))
+    return s
+
+
+CONTEXT = _struct(
+    {
+        c.CONTEXT_KEY_ENVIRONMENT: {
+            "account": "test",
+            "accountCode": "tst",
+            "accountId": "123456789012",
+            "awsTags": {"environment": "Development", "owner": "Team A"},
+            "namePrefix": "aa-tst-usw2",
+            "region": {"region": "us-west-2", "regionCode": "usw2"},
+        }
     }
 )
+_META_60S = fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60))
 PREFIX = f"{c.ANNOTATION_PREFIX}{c.DEFAULT_PREFIX_SEPARATOR}"
-TESTCASES = [
-    TestCase(
+RESOURCE_A = "resource-a"
+ANNOTATION_ACCOUNT = f"{PREFIX}account"
+ANNOTATION_DOMAIN = f"{PREFIX}domain"
+ANNOTATION_LS_DOMAIN = f"{PREFIX}ls-domain"
+# Name built for foo_bar, as written to spec fields and as the RFC1123 metadata.name.
+NAME_FOOBAR = "aa-tst-usw2-xt-foo_bar"
+NAME_FOOBAR_RFC1123 = "aa-tst-usw2-xt-foo-bar"
+_BASE_RESOURCE = {"apiVersion": "example.crossplane.io/v1alpha1", "kind": "XTest"}
+
+
+def _metadata(name: str, annotations: dict | None, labels: dict | None) -> dict:
+    metadata: dict = {"name": name}
+    if annotations is not None:
+        metadata["annotations"] = annotations
+    if labels is not None:
+        metadata["labels"] = labels
+    return metadata
+
+
+def _resource(
+    name: str,
+    annotations: dict | None = None,
+    labels: dict | None = None,
+    spec: dict | None = None,
+) -> structpb.Struct:
+    """Build an XTest resource; metadata and spec fields left as None are omitted."""
+    d = {**_BASE_RESOURCE, "metadata": _metadata(name, annotations, labels)}
+    if spec is not None:
+        d["spec"] = spec
+    return _struct(d)
+
+
+def _configmap_object(
+    name: str,
+    annotations: dict | None = None,
+    labels: dict | None = None,
+    manifest_labels: dict | None = None,
+    tags: dict | None = None,
+) -> structpb.Struct:
+    """Build a provider-kubernetes Object wrapping a ConfigMap in the default namespace."""
+    manifest_metadata: dict = {"namespace": "default"}
+    if manifest_labels is not None:
+        manifest_metadata["labels"] = manifest_labels
+    for_provider: dict = {
+        "manifest": {"apiVersion": "v1", "kind": "ConfigMap", "metadata": manifest_metadata}
+    }
+    if tags is not None:
+        for_provider["tags"] = tags
+    return _struct(
+        {
+            "apiVersion": "kubernetes.crossplane.io/v1alpha2",
+            "kind": "Object",
+            "metadata": _metadata(name, annotations, labels),
+            "spec": {"forProvider": for_provider},
+        }
+    )
+
+
+def _state_a(struct: structpb.Struct) -> fnv1.State:
+    """Return a State holding struct as its only resource, resource-a."""
+    state = fnv1.State()
+    state.resources[RESOURCE_A].resource.CopyFrom(struct)
+    return state
+
+
+_REQUEST_TEMPLATE = fnv1.RunFunctionRequest(context=CONTEXT)
+_RESPONSE_TEMPLATE = fnv1.RunFunctionResponse(meta=_META_60S, context=CONTEXT)
+
+
+def _from_template[M: message.Message](template: M, fields: dict) -> M:
+    msg = type(template)()
+    msg.CopyFrom(template)
+    for name, value in fields.items():
+        getattr(msg, name).CopyFrom(value)
+    return msg
+
+
+def _request(**fields: message.Message) -> fnv1.RunFunctionRequest:
+    """Return a copy of the request template with the given message fields copied in."""
+    return _from_template(_REQUEST_TEMPLATE, fields)
+
+
+def _response(**fields: message.Message) -> fnv1.RunFunctionResponse:
+    """Return a copy of the response template with the given message fields copied in."""
+    return _from_template(_RESPONSE_TEMPLATE, fields)
+
+
+def _case_context_submap() -> TestCase:
+    return TestCase(
         reason="The function should be able to reference a context sub map.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
-                }
+        req=_request(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={},
+                )
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_CONTEXT: structpb.Value(
-                                    string_value=f"{c.CONTEXT_KEY_ENVIRONMENT}/region"
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region"),
-                                            structpb.Value(string_value="regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={c.INPUT_PREFIX: structpb.Value(string_value="bb")}
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region-code"),
-                                            structpb.Value(string_value="ls-domain"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_CONTEXT: f"{c.CONTEXT_KEY_ENVIRONMENT}/region",
+                        c.INPUT_ENV_TO_LABEL: ["region", "regionCode"],
+                        c.INPUT_LABELS: {c.INPUT_PREFIX: "bb"},
+                        c.INPUT_NAME_TEMPLATE: ["region-code", "ls-domain"],
+                    }
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                    },
-                                    "name": "usw2-core-foo",
-                                    "labels": {
-                                        "bb/region": "us-west-2",
-                                        "bb/region-code": "usw2",
-                                    },
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "usw2-core-foo",
+                    annotations={
+                        "do-not-delete": "me",
+                    },
+                    labels={
+                        "bb/region": "us-west-2",
+                        "bb/region-code": "usw2",
+                    },
+                    spec={},
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_modify_metadata() -> TestCase:
+    return TestCase(
         reason="The function should modify the metadata of the resource.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
-                }
+        req=_request(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={},
+                )
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="account"),
-                                            structpb.Value(string_value="accountCode"),
-                                            structpb.Value(string_value="accountId"),
-                                            structpb.Value(string_value="namePrefix"),
-                                            structpb.Value(string_value="region.region"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={c.INPUT_PREFIX: structpb.Value(string_value="bb")}
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                            structpb.Value(string_value="ls-domain"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_ENV_TO_LABEL: [
+                            "account",
+                            "accountCode",
+                            "accountId",
+                            "namePrefix",
+                            "region.region",
+                            "region.regionCode",
+                        ],
+                        c.INPUT_LABELS: {c.INPUT_PREFIX: "bb"},
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix", "ls-domain"],
+                    }
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                    },
-                                    "name": "aa-tst-usw2-core-foo",
-                                    "labels": {
-                                        "bb/account": "bar",
-                                        "bb/account-code": "tst",
-                                        "bb/account-id": "123456789012",
-                                        "bb/name-prefix": "aa-tst-usw2",
-                                        "bb/region": "us-west-2",
-                                        "bb/region-code": "usw2",
-                                    },
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-core-foo",
+                    annotations={
+                        "do-not-delete": "me",
+                    },
+                    labels={
+                        "bb/account": "bar",
+                        "bb/account-code": "tst",
+                        "bb/account-id": "123456789012",
+                        "bb/name-prefix": "aa-tst-usw2",
+                        "bb/region": "us-west-2",
+                        "bb/region-code": "usw2",
+                    },
+                    spec={},
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_tags_from_context() -> TestCase:
+    return TestCase(
         reason="The function should be able to tag resources from a context field.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "foo": "bar",
-                                        }
-                                    },
-                                },
+        req=_request(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={
+                        "forProvider": {
+                            "tags": {
+                                "foo": "bar",
                             }
-                        )
-                    ),
-                }
+                        },
+                    },
+                )
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region.region"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={c.INPUT_PREFIX: structpb.Value(string_value="bb")}
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region.regionCode"),
-                                            structpb.Value(string_value="ls-domain"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_TAGS_FIELD: structpb.Value(string_value="awsTags"),
-                            }
-                        )
-                    )
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_ENV_TO_LABEL: ["region.region", "region.regionCode"],
+                        c.INPUT_LABELS: {c.INPUT_PREFIX: "bb"},
+                        c.INPUT_NAME_TEMPLATE: ["region.regionCode", "ls-domain"],
+                        c.INPUT_TAGS_FIELD: "awsTags",
+                    }
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                    },
-                                    "name": "usw2-core-foo",
-                                    "labels": {
-                                        "bb/region": "us-west-2",
-                                        "bb/region-code": "usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "environment": "Development",
-                                            "foo": "bar",
-                                            "owner": "Team A",
-                                        }
-                                    },
-                                },
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "usw2-core-foo",
+                    annotations={
+                        "do-not-delete": "me",
+                    },
+                    labels={
+                        "bb/region": "us-west-2",
+                        "bb/region-code": "usw2",
+                    },
+                    spec={
+                        "forProvider": {
+                            "tags": {
+                                "environment": "Development",
+                                "foo": "bar",
+                                "owner": "Team A",
                             }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+                        },
+                    },
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_tags_from_input() -> TestCase:
+    return TestCase(
         reason="The function should be able to tag resources from function input.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "foo": "bar",
-                                        }
-                                    },
-                                },
+        req=_request(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={
+                        "forProvider": {
+                            "tags": {
+                                "foo": "bar",
                             }
-                        )
-                    ),
-                }
+                        },
+                    },
+                )
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region.region"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={c.INPUT_PREFIX: structpb.Value(string_value="bb")}
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="region.regionCode"),
-                                            structpb.Value(string_value="ls-domain"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_TAGS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={
-                                            "environment": structpb.Value(string_value="Testing"),
-                                            "managed-by": structpb.Value(string_value="Crossplane"),
-                                        }
-                                    )
-                                ),
-                            }
-                        )
-                    )
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_ENV_TO_LABEL: ["region.region", "region.regionCode"],
+                        c.INPUT_LABELS: {c.INPUT_PREFIX: "bb"},
+                        c.INPUT_NAME_TEMPLATE: ["region.regionCode", "ls-domain"],
+                        c.INPUT_TAGS: {"environment": "Testing", "managed-by": "Crossplane"},
+                    }
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                    },
-                                    "name": "usw2-core-foo",
-                                    "labels": {
-                                        "bb/region": "us-west-2",
-                                        "bb/region-code": "usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "environment": "Testing",
-                                            "foo": "bar",
-                                            "managed-by": "Crossplane",
-                                        }
-                                    },
-                                },
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "usw2-core-foo",
+                    annotations={
+                        "do-not-delete": "me",
+                    },
+                    labels={
+                        "bb/region": "us-west-2",
+                        "bb/region-code": "usw2",
+                    },
+                    spec={
+                        "forProvider": {
+                            "tags": {
+                                "environment": "Testing",
+                                "foo": "bar",
+                                "managed-by": "Crossplane",
                             }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+                        },
+                    },
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_custom_format_from_input() -> TestCase:
+    return TestCase(
         reason="The function should be able to read custom format from Inputs.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="accountCode"),
-                                            structpb.Value(string_value="namePrefix"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix-tenant"),
-                                            structpb.Value(string_value="account-code"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                            structpb.Value(string_value="free-text"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={c.INPUT_PREFIX: structpb.Value(string_value="aa")}
-                                    )
-                                ),
-                                c.INPUT_TEMPLATE_ITEMS_SEPARATOR: structpb.Value(string_value="."),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_ENV_TO_LABEL: ["accountCode", "namePrefix", "region.regionCode"],
+                        c.INPUT_NAME_TEMPLATE: [
+                            "name-prefix-tenant",
+                            "account-code",
+                            "region.regionCode",
+                            "free-text",
+                        ],
+                        c.INPUT_LABELS: {c.INPUT_PREFIX: "aa"},
+                        c.INPUT_TEMPLATE_ITEMS_SEPARATOR: ".",
+                    }
                 }
             ),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                    "annotations": {
-                                        f"{PREFIX}free-text": "baz",
-                                        f"{PREFIX}name-prefix-tenant": "aa",
-                                        f"{c.ANNOTATION_INCLUDE_FORPROVIDER_NAME}": "true",
-                                        f"{c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE}": "true",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        f"{PREFIX}free-text": "baz",
+                        f"{PREFIX}name-prefix-tenant": "aa",
+                        c.ANNOTATION_INCLUDE_FORPROVIDER_NAME: "true",
+                        c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE: "true",
+                    },
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                        },
+                    },
+                )
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa.tst.usw2.baz.foo",
-                                    "labels": {
-                                        "aa/account-code": "tst",
-                                        "aa/name-prefix": "aa-tst-usw2",
-                                        "aa/region-code": "usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "aa.tst.usw2.baz.foo",
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa.tst.usw2.baz.foo",
+                    annotations={},
+                    labels={
+                        "aa/account-code": "tst",
+                        "aa/name-prefix": "aa-tst-usw2",
+                        "aa/region-code": "usw2",
+                    },
+                    spec={
+                        "forProvider": {
+                            "name": "aa.tst.usw2.baz.foo",
+                        },
+                    },
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_mapped_values() -> TestCase:
+    return TestCase(
         reason="The function should be able to use mapped Values.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                            structpb.Value(string_value="domain"),
-                                            structpb.Value(string_value="kind-code"),
-                                        ]
-                                    )
-                                ),
-                                # This is a list of structs with fields from, to and map
-                                c.INPUT_MAPPED_VALUES: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(
-                                                struct_value=structpb.Struct(
-                                                    fields={
-                                                        "fallback": structpb.Value(
-                                                            string_value="void"
-                                                        ),
-                                                        "from": structpb.Value(string_value="kind"),
-                                                        "maxLength": structpb.Value(number_value=9),
-                                                        "to": structpb.Value(
-                                                            string_value="kindCode"
-                                                        ),
-                                                        "map": structpb.Value(
-                                                            struct_value=structpb.Struct(
-                                                                fields={
-                                                                    "XTest": structpb.Value(
-                                                                        string_value="xt"
-                                                                    )
-                                                                }
-                                                            )
-                                                        ),
-                                                    }
-                                                )
-                                            ),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
-                }
-            ),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix", "domain", "kind-code"],
+                        # This is a list of structs with fields from, to and map
+                        c.INPUT_MAPPED_VALUES: [
                             {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                    "annotations": {
-                                        f"{PREFIX}domain": "baz",
-                                        f"{c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION}": "true",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {},
-                                    },
-                                },
+                                "fallback": "void",
+                                "from": "kind",
+                                "maxLength": 9,
+                                "to": "kindCode",
+                                "map": {"XTest": "xt"},
                             }
-                        )
-                    ),
+                        ],
+                    }
                 }
             ),
-        ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-baz-xt-foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {
-                                            "Name": "aa-tst-usw2-baz-xt-foo",
-                                        },
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        ANNOTATION_DOMAIN: "baz",
+                        c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true",
+                    },
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                            "tags": {},
+                        },
+                    },
+                )
             ),
-            context=CONTEXT,
         ),
-    ),
-    TestCase(
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-baz-xt-foo",
+                    annotations={},
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                            "tags": {
+                                "Name": "aa-tst-usw2-baz-xt-foo",
+                            },
+                        },
+                    },
+                )
+            )
+        ),
+    )
+
+
+def _case_kind_code_not_masked() -> TestCase:
+    return TestCase(
         reason="Per-resource kind code is not masked by mapped ones.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                            structpb.Value(string_value="domain"),
-                                            structpb.Value(string_value="kind-code"),
-                                        ]
-                                    )
-                                ),
-                                # This is a list of structs with fields from, to and map
-                                c.INPUT_MAPPED_VALUES: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(
-                                                struct_value=structpb.Struct(
-                                                    fields={
-                                                        "fallback": structpb.Value(
-                                                            string_value="void"
-                                                        ),
-                                                        "from": structpb.Value(string_value="kind"),
-                                                        "maxLength": structpb.Value(number_value=9),
-                                                        "to": structpb.Value(
-                                                            string_value="kindCode"
-                                                        ),
-                                                        "map": structpb.Value(
-                                                            struct_value=structpb.Struct(
-                                                                fields={
-                                                                    "XTest": structpb.Value(
-                                                                        string_value="xt"
-                                                                    )
-                                                                }
-                                                            )
-                                                        ),
-                                                    }
-                                                )
-                                            ),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
-                }
-            ),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix", "domain", "kind-code"],
+                        # This is a list of structs with fields from, to and map
+                        c.INPUT_MAPPED_VALUES: [
                             {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                    "annotations": {
-                                        f"{PREFIX}domain": "baz",
-                                        f"{c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION}": "true",
-                                        f"{PREFIX}kindCode": "qux",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {},
-                                    },
-                                },
+                                "fallback": "void",
+                                "from": "kind",
+                                "maxLength": 9,
+                                "to": "kindCode",
+                                "map": {"XTest": "xt"},
                             }
-                        )
-                    ),
+                        ],
+                    }
                 }
             ),
-        ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-baz-qux-foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {
-                                            "Name": "aa-tst-usw2-baz-qux-foo",
-                                        },
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        ANNOTATION_DOMAIN: "baz",
+                        c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true",
+                        f"{PREFIX}kindCode": "qux",
+                    },
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                            "tags": {},
+                        },
+                    },
+                )
             ),
-            context=CONTEXT,
         ),
-    ),
-    TestCase(
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-baz-qux-foo",
+                    annotations={},
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                            "tags": {
+                                "Name": "aa-tst-usw2-baz-qux-foo",
+                            },
+                        },
+                    },
+                )
+            )
+        ),
+    )
+
+
+def _case_rfc1123_metadata_name() -> TestCase:
+    return TestCase(
         reason="The function must always return an RFC1123 compliant metadata.name",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                            structpb.Value(string_value="kind-code"),
-                                        ]
-                                    )
-                                ),
-                                # This is a list of structs with fields from, to and map
-                                c.INPUT_MAPPED_VALUES: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(
-                                                struct_value=structpb.Struct(
-                                                    fields={
-                                                        "from": structpb.Value(string_value="kind"),
-                                                        "to": structpb.Value(
-                                                            string_value="kindCode"
-                                                        ),
-                                                        "map": structpb.Value(
-                                                            struct_value=structpb.Struct(
-                                                                fields={
-                                                                    "XTest": structpb.Value(
-                                                                        string_value="xt"
-                                                                    )
-                                                                }
-                                                            )
-                                                        ),
-                                                    }
-                                                )
-                                            ),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix", "kind-code"],
+                        # This is a list of structs with fields from, to and map
+                        c.INPUT_MAPPED_VALUES: [
+                            {"from": "kind", "to": "kindCode", "map": {"XTest": "xt"}}
+                        ],
+                    }
                 }
             ),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo_bar",
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION}": "true",
-                                        f"{c.ANNOTATION_INCLUDE_FORPROVIDER_NAME}": "true",
-                                        f"{c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE}": "true",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {
-                                            "custom-tag": "custom-value",
-                                        },
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
+            desired=_state_a(
+                _resource(
+                    "foo_bar",
+                    annotations={
+                        c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true",
+                        c.ANNOTATION_INCLUDE_FORPROVIDER_NAME: "true",
+                        c.ANNOTATION_FORPROVIDER_NAMEOVERRIDE: "true",
+                    },
+                    spec={
+                        "forProvider": {
+                            "name": "hey",
+                            "tags": {
+                                "custom-tag": "custom-value",
+                            },
+                        },
+                    },
+                )
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-xt-foo-bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "aa-tst-usw2-xt-foo_bar",
-                                        "tags": {
-                                            "Name": "aa-tst-usw2-xt-foo_bar",
-                                            "custom-tag": "custom-value",
-                                        },
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                }
-            ),
-            context=CONTEXT,
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    NAME_FOOBAR_RFC1123,
+                    annotations={},
+                    spec={
+                        "forProvider": {
+                            "name": NAME_FOOBAR,
+                            "tags": {
+                                "Name": NAME_FOOBAR,
+                                "custom-tag": "custom-value",
+                            },
+                        },
+                    },
+                )
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_write_any_spec_field() -> TestCase:
+    return TestCase(
         reason="The function must be able to write in any field of the spec.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                            structpb.Value(string_value="kind-code"),
-                                        ]
-                                    )
-                                ),
-                                # This is a list of structs with fields from, to and map
-                                c.INPUT_MAPPED_VALUES: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(
-                                                struct_value=structpb.Struct(
-                                                    fields={
-                                                        "from": structpb.Value(string_value="kind"),
-                                                        "to": structpb.Value(
-                                                            string_value="kindCode"
-                                                        ),
-                                                        "map": structpb.Value(
-                                                            struct_value=structpb.Struct(
-                                                                fields={
-                                                                    "XTest": structpb.Value(
-                                                                        string_value="xt"
-                                                                    )
-                                                                }
-                                                            )
-                                                        ),
-                                                    }
-                                                )
-                                            ),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix", "kind-code"],
+                        # This is a list of structs with fields from, to and map
+                        c.INPUT_MAPPED_VALUES: [
+                            {"from": "kind", "to": "kindCode", "map": {"XTest": "xt"}}
+                        ],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo_bar",
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION}": "true",
-                                        f"{c.ANNOTATION_INCLUDE_FORPROVIDER_NAME}": "true",
-                                        f"{c.ANNOTATION_FORPROVIDER_NAME_FIELD}": "cluster.name",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "custom-tag": "custom-value",
-                                        },
+                    RESOURCE_A: fnv1.Resource(
+                        resource=_resource(
+                            "foo_bar",
+                            annotations={
+                                c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true",
+                                c.ANNOTATION_INCLUDE_FORPROVIDER_NAME: "true",
+                                c.ANNOTATION_FORPROVIDER_NAME_FIELD: "cluster.name",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "tags": {
+                                        "custom-tag": "custom-value",
                                     },
                                 },
-                            }
+                            },
                         )
                     ),
                     "resource-b": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo_bar",
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION}": "true",
-                                        f"{c.ANNOTATION_INCLUDE_FORPROVIDER_NAME}": "true",
-                                        f"{c.ANNOTATION_FORPROVIDER_NAME_FIELD}": "clusterName",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "tags": {
-                                            "custom-tag": "custom-value",
-                                        },
+                        resource=_resource(
+                            "foo_bar",
+                            annotations={
+                                c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true",
+                                c.ANNOTATION_INCLUDE_FORPROVIDER_NAME: "true",
+                                c.ANNOTATION_FORPROVIDER_NAME_FIELD: "clusterName",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "tags": {
+                                        "custom-tag": "custom-value",
                                     },
                                 },
-                            }
+                            },
                         )
                     ),
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-xt-foo-bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "cluster": {
-                                            "name": "aa-tst-usw2-xt-foo_bar",
-                                        },
-                                        "tags": {
-                                            "Name": "aa-tst-usw2-xt-foo_bar",
-                                            "custom-tag": "custom-value",
-                                        },
+                    RESOURCE_A: fnv1.Resource(
+                        resource=_resource(
+                            NAME_FOOBAR_RFC1123,
+                            annotations={},
+                            spec={
+                                "forProvider": {
+                                    "cluster": {
+                                        "name": NAME_FOOBAR,
+                                    },
+                                    "tags": {
+                                        "Name": NAME_FOOBAR,
+                                        "custom-tag": "custom-value",
                                     },
                                 },
                             },
                         )
                     ),
                     "resource-b": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-xt-foo-bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "clusterName": "aa-tst-usw2-xt-foo_bar",
-                                        "tags": {
-                                            "Name": "aa-tst-usw2-xt-foo_bar",
-                                            "custom-tag": "custom-value",
-                                        },
+                        resource=_resource(
+                            NAME_FOOBAR_RFC1123,
+                            annotations={},
+                            spec={
+                                "forProvider": {
+                                    "clusterName": NAME_FOOBAR,
+                                    "tags": {
+                                        "Name": NAME_FOOBAR,
+                                        "custom-tag": "custom-value",
                                     },
                                 },
                             },
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_no_tags_field() -> TestCase:
+    return TestCase(
         reason="Tags shouldn't be written if the resource doesn't support.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="namePrefix"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
                     "supports-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_LABELS_AS_TAGS}": "true",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {},
-                                    },
+                        resource=_resource(
+                            "foo",
+                            annotations={
+                                c.ANNOTATION_INCLUDE_LABELS_AS_TAGS: "true",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "name": "hey",
+                                    "tags": {},
                                 },
-                            }
+                            },
                         )
                     ),
                     "does-not-support-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "bar",
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_LABELS_AS_TAGS}": "true",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                    },
+                        resource=_resource(
+                            "bar",
+                            annotations={
+                                c.ANNOTATION_INCLUDE_LABELS_AS_TAGS: "true",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "name": "hey",
                                 },
-                            }
+                            },
                         )
                     ),
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
                     "supports-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "labels": {
+                        resource=_resource(
+                            "aa-tst-usw2-foo",
+                            annotations={},
+                            labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "name": "hey",
+                                    "tags": {
                                         "name-prefix": "aa-tst-usw2",
                                     },
-                                    "name": "aa-tst-usw2-foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                        "tags": {
-                                            "name-prefix": "aa-tst-usw2",
-                                        },
-                                    },
                                 },
-                            }
+                            },
                         )
                     ),
                     "does-not-support-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {},
-                                    "labels": {
-                                        "name-prefix": "aa-tst-usw2",
-                                    },
-                                    "name": "aa-tst-usw2-bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "name": "hey",
-                                    },
+                        resource=_resource(
+                            "aa-tst-usw2-bar",
+                            annotations={},
+                            labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
+                            spec={
+                                "forProvider": {
+                                    "name": "hey",
                                 },
-                            }
+                            },
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_missing_metadata() -> TestCase:
+    return TestCase(
         reason="Don't fail when resource doesn't have metadata field.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="namePrefix"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
+                        resource=_struct(
                             {
                                 "apiVersion": "example.crossplane.io/v1alpha1",
                                 "kind": "XTest",
@@ -1184,12 +792,11 @@ TESTCASES = [
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
+                        resource=_struct(
                             {
                                 "apiVersion": "example.crossplane.io/v1alpha1",
                                 "kind": "XTest",
@@ -1207,570 +814,435 @@ TESTCASES = [
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_propagate_labels_to_field() -> TestCase:
+    return TestCase(
         reason="Propagate labels to field.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="namePrefix"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {
-                                        f"{c.ANNOTATION_REPLICATE_LABELS_TO}": "spec.forProvider.manifest.metadata.labels",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "foo",
+                            annotations={
+                                c.ANNOTATION_REPLICATE_LABELS_TO: "spec.forProvider.manifest.metadata.labels",
+                            },
                         )
                     ),
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-foo",
-                                    "labels": {
-                                        "name-prefix": "aa-tst-usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                                "labels": {
-                                                    "name-prefix": "aa-tst-usw2",
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "aa-tst-usw2-foo",
+                            annotations={},
+                            labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
+                            manifest_labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_annotations_isolated() -> TestCase:
+    return TestCase(
         reason="A resource annotations does not affect others.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="namePrefix"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {
-                                        f"{c.ANNOTATION_REPLICATE_LABELS_TO}": "spec.forProvider.manifest.metadata.labels",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                    },
-                                },
-                            }
-                        )
-                    ),
-                    "should-be-ignored": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "name": "bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "foo",
+                            annotations={
+                                c.ANNOTATION_REPLICATE_LABELS_TO: "spec.forProvider.manifest.metadata.labels",
+                            },
                         )
                     ),
+                    "should-be-ignored": fnv1.Resource(resource=_configmap_object("bar")),
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
                     "missing-metadata": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-foo",
-                                    "labels": {
-                                        "name-prefix": "aa-tst-usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                                "labels": {
-                                                    "name-prefix": "aa-tst-usw2",
-                                                },
-                                            },
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "aa-tst-usw2-foo",
+                            annotations={},
+                            labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
+                            manifest_labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
                         )
                     ),
                     "should-be-ignored": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "labels": {
-                                        "name-prefix": "aa-tst-usw2",
-                                    },
-                                    "name": "aa-tst-usw2-bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "aa-tst-usw2-bar",
+                            labels={
+                                "name-prefix": "aa-tst-usw2",
+                            },
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-    TestCase(
+    )
+
+
+def _case_labels_as_tags_annotation_override() -> TestCase:
+    return TestCase(
         reason="Labels as tag annotation overrides input.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_LABELS: structpb.Value(
-                                    struct_value=structpb.Struct(
-                                        fields={
-                                            c.INPUT_LABELS_AS_TAGS: structpb.Value(
-                                                string_value="true"
-                                            )
-                                        }
-                                    )
-                                ),
-                                c.INPUT_ENV_TO_LABEL: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="accountCode"),
-                                            structpb.Value(string_value="namePrefix"),
-                                            structpb.Value(string_value="region.regionCode"),
-                                        ]
-                                    )
-                                ),
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="name-prefix"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_LABELS: {c.INPUT_LABELS_AS_TAGS: "true"},
+                        c.INPUT_ENV_TO_LABEL: ["accountCode", "namePrefix", "region.regionCode"],
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                    }
                 }
             ),
             desired=fnv1.State(
                 resources={
-                    "gimme-some-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "name": "foo",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                        "tags": {},
-                                    },
-                                },
-                            }
-                        )
-                    ),
+                    "gimme-some-tags": fnv1.Resource(resource=_configmap_object("foo", tags={})),
                     "no-tags-please": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {
-                                        f"{c.ANNOTATION_INCLUDE_LABELS_AS_TAGS}": "false",
-                                    },
-                                    "name": "bar",
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                        "tags": {},
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "bar",
+                            annotations={
+                                c.ANNOTATION_INCLUDE_LABELS_AS_TAGS: "false",
+                            },
+                            tags={},
                         )
                     ),
                 }
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
+        want=_response(
             desired=fnv1.State(
                 resources={
                     "gimme-some-tags": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "name": "aa-tst-usw2-foo",
-                                    "labels": {
-                                        "account-code": "tst",
-                                        "name-prefix": "aa-tst-usw2",
-                                        "region-code": "usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                        "tags": {
-                                            "account-code": "tst",
-                                            "name-prefix": "aa-tst-usw2",
-                                            "region-code": "usw2",
-                                        },
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "aa-tst-usw2-foo",
+                            labels={
+                                "account-code": "tst",
+                                "name-prefix": "aa-tst-usw2",
+                                "region-code": "usw2",
+                            },
+                            tags={
+                                "account-code": "tst",
+                                "name-prefix": "aa-tst-usw2",
+                                "region-code": "usw2",
+                            },
                         )
                     ),
                     "no-tags-please": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "kubernetes.crossplane.io/v1alpha2",
-                                "kind": "Object",
-                                "metadata": {
-                                    "annotations": {},
-                                    "name": "aa-tst-usw2-bar",
-                                    "labels": {
-                                        "account-code": "tst",
-                                        "name-prefix": "aa-tst-usw2",
-                                        "region-code": "usw2",
-                                    },
-                                },
-                                "spec": {
-                                    "forProvider": {
-                                        "manifest": {
-                                            "apiVersion": "v1",
-                                            "kind": "ConfigMap",
-                                            "metadata": {
-                                                "namespace": "default",
-                                            },
-                                        },
-                                        "tags": {},
-                                    },
-                                },
-                            }
+                        resource=_configmap_object(
+                            "aa-tst-usw2-bar",
+                            annotations={},
+                            labels={
+                                "account-code": "tst",
+                                "name-prefix": "aa-tst-usw2",
+                                "region-code": "usw2",
+                            },
+                            tags={},
                         )
                     ),
                 }
-            ),
-            context=CONTEXT,
+            )
         ),
-    ),
-]
+    )
 
-TESTEXCEPTIONS = [
-    TestCase(
-        reason="The function should abort when name items are missing and leave resource unchanged.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
+
+def _case_non_object_context_tags() -> TestCase:
+    return TestCase(
+        reason="A context tags field that isn't an object is skipped, other tags are still set.",
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_TAGS: {"team": "core"},
+                        # namePrefix holds a string in the context
+                        c.INPUT_TAGS_FIELD: "namePrefix",
+                    }
                 }
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_NAME_TEMPLATE: structpb.Value(
-                                    list_value=structpb.ListValue(
-                                        values=[
-                                            structpb.Value(string_value="non-existing-field"),
-                                            structpb.Value(string_value="ls-domain"),
-                                        ]
-                                    )
-                                ),
-                            }
-                        )
-                    )
-                }
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={c.ANNOTATION_INCLUDE_TAG_NAME_ANNOTATION: "true"},
+                    spec={"forProvider": {"tags": {"foo": "bar"}}},
+                )
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "annotations": {
-                                        "do-not-delete": "me",
-                                        f"{PREFIX}account": "bar",
-                                        f"{PREFIX}ls-domain": "core",
-                                    },
-                                    "name": "foo",
-                                },
-                                "spec": {},
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-foo",
+                    annotations={},
+                    spec={
+                        "forProvider": {
+                            "tags": {
+                                "Name": "aa-tst-usw2-foo",
+                                "foo": "bar",
+                                "team": "core",
                             }
-                        )
-                    ),
+                        }
+                    },
+                )
+            )
+        ),
+    )
+
+
+def _case_labels_to_existing_field() -> TestCase:
+    return TestCase(
+        reason="Labels replicated to an existing map are merged into that map.",
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
-            context=CONTEXT,
+            desired=_state_a(
+                _configmap_object(
+                    "foo",
+                    annotations={
+                        c.ANNOTATION_REPLICATE_LABELS_TO: "spec.forProvider.manifest.metadata.labels",
+                    },
+                    manifest_labels={"app": "foo"},
+                )
+            ),
         ),
-    ),
-    TestCase(
-        reason="The function should abort when the context is missing.",
-        req=fnv1.RunFunctionRequest(
-            context=CONTEXT,
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
+        want=_response(
+            desired=_state_a(
+                _configmap_object(
+                    "aa-tst-usw2-foo",
+                    annotations={},
+                    labels={"name-prefix": "aa-tst-usw2"},
+                    manifest_labels={"app": "foo", "name-prefix": "aa-tst-usw2"},
+                )
+            )
+        ),
+    )
+
+
+def _case_labels_to_missing_field() -> TestCase:
+    return TestCase(
+        reason="Labels replicated to a missing nested field create its parents.",
+        req=_request(
+            input=_struct(
+                {
+                    "spec": {
+                        c.INPUT_NAME_TEMPLATE: ["name-prefix"],
+                        c.INPUT_ENV_TO_LABEL: ["namePrefix"],
+                    }
                 }
             ),
-            input=structpb.Struct(
-                fields={
-                    "spec": structpb.Value(
-                        struct_value=structpb.Struct(
-                            fields={
-                                c.INPUT_CONTEXT: structpb.Value(
-                                    string_value="non-existing-context"
-                                ),
-                            }
-                        )
-                    )
-                }
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        c.ANNOTATION_REPLICATE_LABELS_TO: "spec.template.metadata.labels",
+                    },
+                    spec={},
+                )
             ),
         ),
-        want=fnv1.RunFunctionResponse(
-            meta=fnv1.ResponseMeta(ttl=durationpb.Duration(seconds=60)),
-            desired=fnv1.State(
-                resources={
-                    "resource-a": fnv1.Resource(
-                        resource=resource.dict_to_struct(
-                            {
-                                "apiVersion": "example.crossplane.io/v1alpha1",
-                                "kind": "XTest",
-                                "metadata": {
-                                    "name": "foo",
-                                },
-                                "spec": {},
-                            }
-                        )
-                    ),
-                }
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-foo",
+                    annotations={},
+                    labels={"name-prefix": "aa-tst-usw2"},
+                    spec={"template": {"metadata": {"labels": {"name-prefix": "aa-tst-usw2"}}}},
+                )
+            )
+        ),
+    )
+
+
+def _case_forprovider_name_missing_parents() -> TestCase:
+    return TestCase(
+        reason="A nested forProvider name field is created along with its missing parents.",
+        req=_request(
+            input=_struct({"spec": {c.INPUT_NAME_TEMPLATE: ["name-prefix"]}}),
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        c.ANNOTATION_INCLUDE_FORPROVIDER_NAME: "true",
+                        c.ANNOTATION_FORPROVIDER_NAME_FIELD: "cluster.config.name",
+                    },
+                    spec={"forProvider": {}},
+                )
+            ),
+        ),
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "aa-tst-usw2-foo",
+                    annotations={},
+                    spec={"forProvider": {"cluster": {"config": {"name": "aa-tst-usw2-foo"}}}},
+                )
+            )
+        ),
+    )
+
+
+def _case_missing_name_items() -> TestCase:
+    return TestCase(
+        reason="The function should abort when name items are missing and leave resource unchanged.",
+        req=_request(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={},
+                )
             ),
-            context=CONTEXT,
+            input=_struct({"spec": {c.INPUT_NAME_TEMPLATE: ["non-existing-field", "ls-domain"]}}),
+        ),
+        want=_response(
+            desired=_state_a(
+                _resource(
+                    "foo",
+                    annotations={
+                        "do-not-delete": "me",
+                        ANNOTATION_ACCOUNT: "bar",
+                        ANNOTATION_LS_DOMAIN: "core",
+                    },
+                    spec={},
+                )
+            )
+        ),
+        expects_abort=True,
+    )
+
+
+def _case_missing_context() -> TestCase:
+    return TestCase(
+        reason="The function should abort when the context is missing.",
+        req=_request(
+            desired=_state_a(_resource("foo", spec={})),
+            input=_struct({"spec": {c.INPUT_CONTEXT: "non-existing-context"}}),
         ),
-    ),
+        want=_response(desired=_state_a(_resource("foo", spec={}))),
+        expects_abort=True,
+    )
+
+
+TESTCASE_FACTORIES = [
+    _case_context_submap,
+    _case_modify_metadata,
+    _case_tags_from_context,
+    _case_tags_from_input,
+    _case_custom_format_from_input,
+    _case_mapped_values,
+    _case_kind_code_not_masked,
+    _case_rfc1123_metadata_name,
+    _case_write_any_spec_field,
+    _case_no_tags_field,
+    _case_missing_metadata,
+    _case_propagate_labels_to_field,
+    _case_annotations_isolated,
+    _case_labels_as_tags_annotation_override,
+    _case_non_object_context_tags,
+    _case_labels_to_existing_field,
+    _case_labels_to_missing_field,
+    _case_forprovider_name_missing_parents,
+    _case_missing_name_items,
+    _case_missing_context,
 ]
+TESTCASE_IDS = [factory.__name__.removeprefix("_case_") for factory in TESTCASE_FACTORIES]
+
+
+def testcases() -> list[TestCase]:
+    """Build every case.
 
+    RunFunction mutates the request it is given, so the cases are built afresh on every call
+    instead of being cached.
+    """
+    return [factory() for factory in TESTCASE_FACTORIES]
+
+
+class TestRunner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.runner = fn.Runner()
+        # Building a spec'd AsyncMock introspects the whole ServicerContext API,
+        # so build it once and reset it for each case instead.
+        cls.mock_context = mock.AsyncMock(spec=grpc.aio.ServicerContext)
+        # One event loop for the whole class instead of one per test method.
+        cls.loop = asyncio.Runner()
+        cls.addClassCleanup(cls.loop.close)
 
-class TestRunner(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         # Allow larger diffs, since we diff large strings of JSON.
         self.maxDiff = None
-        logging.configure(level=logging.Level.DISABLED)
 
-    async def test_run_function(self) -> None:
-        runner = fn.Runner()
-        for i, case in enumerate(TESTCASES):
-            got = await runner.RunFunction(case.req, None)
+    def assertMessageEqual(  # noqa: N802
+        self, want: message.Message, got: message.Message, msg: str
+    ) -> None:
+        """Compare messages directly, only rendering them as dicts to diff a mismatch."""
+        if want != got:
             self.assertEqual(
-                json_format.MessageToDict(case.want),
-                json_format.MessageToDict(got),
-                msg=f"Failed for test number {i}: '{case.reason}' (-want, +got)",
+                json_format.MessageToDict(want), json_format.MessageToDict(got), msg=msg
             )
 
-    async def test_exceptions(self) -> None:
-        runner = fn.Runner()
-        mock_context = mock.AsyncMock(spec=grpc.aio.ServicerContext)
-        for i, case in enumerate(TESTEXCEPTIONS):
-            got = await runner.RunFunction(case.req, mock_context)
-            mock_context.abort.assert_called()
-            self.assertEqual(
-                json_format.MessageToDict(case.want),
-                json_format.MessageToDict(got),
-                msg=f"Failed for test number {i}: '{case.reason}' (-want, +got)",
-            )
+    def test_run_function(self) -> None:
+        mock_context = self.mock_context
+        for i, (case_id, case) in enumerate(zip(TESTCASE_IDS, testcases(), strict=True)):
+            with self.subTest(case_id):
+                mock_context.reset_mock()
+                got = self.loop.run(self.runner.RunFunction(case.req, mock_context))
+                if case.expects_abort:
+                    mock_context.abort.assert_awaited_once()
+                else:
+                    mock_context.abort.assert_not_awaited()
+                self.assertMessageEqual(
+                    case.want,
+                    got,
+                    msg=f"Failed for test number {i}: '{case.reason}' (-want, +got)",
+                )
 
 
 if __name__ == "__main__":